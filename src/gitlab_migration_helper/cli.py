@@ -2,34 +2,25 @@
 
 import functools
 import logging
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Literal
 
 import click
 from click_option_group import optgroup
 from mypy_extensions import KwArg
 
-from gitlab_migration_helper.gitlab_utils import get_gitlab_group, get_gitlab_instance
 from gitlab_migration_helper.loggingconfig import setup_logging
-from gitlab_migration_helper.main import main
-from gitlab_migration_helper.pruning import PreservationPolicy
 
+if TYPE_CHECKING:
+    from gitlab import Gitlab
 
-def gitlab_options(
-    options: Callable[[...], None],  # type: ignore
-) -> Callable[[...], None]:  # type: ignore
-    """Extend CLI options with set of base options.
-
-    Args:
-        options: CLI options to extend.
+_GROUP_NAME_NOTE = (
+    " !ATTENTION! Group names can be ambiguous; if in doubt use the group id!"
+)
 
-    Returns:
-        The extended options.
-    """
-    f = " !ATTENTION! Group names can be ambiguous; if in doubt use the group id!"
-
-    @click.option(
+_GITLAB_OPTIONS = (
+    click.option(
         "--origin-gitlab",
         required=True,
         type=str,
@@ -37,36 +28,37 @@ def gitlab_options(
         show_default=True,
         default="https://gitlab.com/",
         help="URL of the origin Gitlab instance from where to migrate.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--origin-certificate",
         required=True,
         type=str,
         envvar="ORIGIN_CERTIFICATE",
         help="SSL certificate for communication with the origin Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--origin-key",
         required=True,
         type=str,
         envvar="ORIGIN_KEY",
         help="SSL key for communication with the origin Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--origin-token",
         required=True,
         type=str,
         envvar="ORIGIN_TOKEN",
         help="Gitlab token for interaction with the origin Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--origin-group",
         required=True,
         type=str,
         envvar="ORIGIN_GROUP",
-        help="Group in the origin Gitlab, which holds all repositories to migrate." + f,
-    )
-    @click.option(
+        help="Group in the origin Gitlab, which holds all repositories to migrate."
+        + _GROUP_NAME_NOTE,
+    ),
+    click.option(
         "--destination-gitlab",
         required=True,
         type=str,
@@ -74,69 +66,53 @@ def gitlab_options(
         show_default=True,
         default="https://gitlab.com/",
         help="URL of the destination Gitlab instance from where to migrate.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--destination-certificate",
         required=False,
         type=str,
         envvar="DESTINATION_CERTIFICATE",
         help="SSL certificate for communication with the destination Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--destination-key",
         required=False,
         type=str,
         envvar="DESTINATION_KEY",
         help="SSL key for communication with the destination Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--destination-token",
         required=False,
         type=str,
         envvar="DESTINATION_TOKEN",
         help="Gitlab token for interaction with the destination Gitlab instance.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--destination-group",
         required=False,
         type=str,
         envvar="DESTINATION_GROUP",
-        help="Group in the destination Gitlab to migrate to." + f,
-    )
-    @click.option(
+        help="Group in the destination Gitlab to migrate to." + _GROUP_NAME_NOTE,
+    ),
+    click.option(
         "--no-dry-run",
         required=False,
         is_flag=True,
         default=False,
         help="If set, the projects will be pruned and migrated afterwards effectively.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--exclude-subgroups",
         required=False,
         is_flag=True,
         default=False,
         help="If set, projects in subgroups will be excluded from the migration.",
-    )
-    @functools.wraps(options)
-    def options_wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
-        return options(*args, **kwargs)
+    ),
+)
 
-    return options_wrapper
-
-
-def add_project_options(
-    options: Callable[[...], None],  # type: ignore
-) -> Callable[[...], None]:  # type: ignore
-    """Extend CLI options.
-
-    Args:
-        options: CLI options to extend.
-
-    Returns:
-        The extended options.
-    """
-
-    @click.option(
+_PROJECT_OPTIONS = (
+    click.option(
         "--include-archived",
         "include_archived",
         required=False,
@@ -144,8 +120,8 @@ def add_project_options(
         default=False,
         show_default=True,
         help="Add this flag to also prune and migrate archived projects.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--pb",
         "preserve_branches",
         envvar="PROTECTED_BRANCHES",
@@ -153,54 +129,46 @@ def add_project_options(
         type=click.STRING,
         multiple=True,
         help="Branches to keep other than 'main' and 'master'.",
-    )
-    @functools.wraps(options)
-    def options_wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
-        return options(*args, **kwargs)
-
-    return options_wrapper
-
-
-def assume_yes_option(
-    options: Callable[[...], None],  # type: ignore
-) -> Callable[[...], None]:  # type: ignore
-    """Extend CLI options with an optional prompt skip.
-
-    Args:
-        options: CLI options to extend.
-
-    Returns:
-        The extended options.
-    """
+    ),
+    click.option(
+        "--workers",
+        required=False,
+        type=click.IntRange(min=1),
+        default=4,
+        show_default=True,
+        help="Number of projects processed in parallel.",
+    ),
+    click.option(
+        "--skip-ids",
+        "skip_ids",
+        required=False,
+        type=int,
+        multiple=True,
+        help="ID of a project to leave out. Can be given multiple times.",
+    ),
+    click.option(
+        "--transfer-timeout",
+        required=False,
+        type=click.IntRange(min=1),
+        default=3600,
+        show_default=True,
+        help="Seconds to wait for each project export and import to finish.",
+    ),
+)
 
-    @click.option(
+_ASSUME_YES_OPTIONS = (
+    click.option(
         "--prompt",
         required=False,
         is_flag=True,
         default=False,
         show_default=True,
-        help="If not set, skip the prompting per project, assuming 'yes' as answer.",
-    )
-    @functools.wraps(options)
-    def options_wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
-        return options(*args, **kwargs)
-
-    return options_wrapper
-
-
-def local_export(
-    options: Callable[[...], None],  # type: ignore
-) -> Callable[[...], None]:  # type: ignore
-    """Extend CLI options with an optional save to disk command.
-
-    Args:
-        options: CLI options to extend.
+        help="If set, list the projects to process and ask once for confirmation.",
+    ),
+)
 
-    Returns:
-        The extended options.
-    """
-
-    @click.option(
+_LOCAL_EXPORT_OPTIONS = (
+    click.option(
         "--export-locally",
         required=False,
         is_flag=True,
@@ -208,8 +176,8 @@ def local_export(
         show_default=True,
         help="If set, specified projects will be "
         "stored on local disk in gmh project root",
-    )
-    @click.option(
+    ),
+    click.option(
         "--export-path",
         required=False,
         type=click.Path(exists=False),
@@ -217,61 +185,135 @@ def local_export(
         show_default=True,
         help="If set, specified projects will be "
         "stored on local disk under the provided path",
-    )
-    @functools.wraps(options)
-    def options_wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
-        return options(*args, **kwargs)
-
-    return options_wrapper
-
-
-def add_default_preservation_policy_option(
-    options: Callable[[KwArg(Any)], None],
-) -> Callable[[...], None]:  # type: ignore
-    """Extend CLI options.
-
-    Args:
-        options: CLI options to extend.
-
-    Returns:
-        The extended options.
-    """
-    msg = "These parameters control how project pipelines and releases are kept. "
-    msg += "At least one has to be set. "
-    msg += "If '--keep-latest-items ...' is set, other parameters are ignored. "
-    msg += "If both '--minimum-creation-date ...' and '--keep-latest-items ...' are "
-    msg += "set, the later result date is picked."
-
-    @optgroup.group(
+    ),
+)
+
+_PRESERVATION_POLICY_MESSAGE = (
+    "These parameters control how project pipelines and releases are kept. "
+    "At least one has to be set. "
+    "If '--keep-latest-items ...' is set, other parameters are ignored. "
+    "If both '--minimum-creation-date ...' and '--keep-latest-items ...' are "
+    "set, the later result date is picked."
+)
+
+_PRESERVATION_POLICY_OPTIONS = (
+    optgroup.group(
         "Project preservation parameters",
-        help=msg,
-    )
-    @optgroup.option(
+        help=_PRESERVATION_POLICY_MESSAGE,
+    ),
+    optgroup.option(
         "--minimum-creation-date",
         required=False,
         type=click.DateTime(),
         default=None,
         help="Keep items, that have been created latest at this date.",
-    )
-    @optgroup.option(
+    ),
+    optgroup.option(
         "--maximum-age-in-days",
         required=False,
         type=int,
         default=None,
         help="Keep items, that are maximum this old.",
-    )
-    @optgroup.option(
+    ),
+    optgroup.option(
         "--keep-latest-items",
         required=False,
         type=int,
         default=None,
         help="Keep the last x items from project releases and pipelines.",
-    )
-    @functools.wraps(options)
-    def options_wrapper(*args, **kwargs):  # noqa: ANN202, ANN002, ANN003
-        return options(*args, **kwargs)
+    ),
+)
+
+
+def _apply_options(
+    options: Callable[..., None],
+    decorators: Iterable[Callable[[Any], Any]],
+) -> Callable[..., None]:
+    """Attach option decorators to a command function in their declaration order.
+
+    The decorators register their parameters directly on the function, so no
+    pass-through wrapper is added per option set.
+
+    Args:
+        options: CLI options to extend.
+        decorators: Option decorators as they would be stacked on the function.
+
+    Returns:
+        The extended options.
+    """
+    for decorator in reversed(tuple(decorators)):
+        options = decorator(options)
+    return options
+
+
+def gitlab_options(
+    options: Callable[..., None],
+) -> Callable[..., None]:
+    """Extend CLI options with set of base options.
+
+    Args:
+        options: CLI options to extend.
+
+    Returns:
+        The extended options.
+    """
+    return _apply_options(options, _GITLAB_OPTIONS)
 
-    return options_wrapper
+
+def add_project_options(
+    options: Callable[..., None],
+) -> Callable[..., None]:
+    """Extend CLI options.
+
+    Args:
+        options: CLI options to extend.
+
+    Returns:
+        The extended options.
+    """
+    return _apply_options(options, _PROJECT_OPTIONS)
+
+
+def assume_yes_option(
+    options: Callable[..., None],
+) -> Callable[..., None]:
+    """Extend CLI options with an optional prompt skip.
+
+    Args:
+        options: CLI options to extend.
+
+    Returns:
+        The extended options.
+    """
+    return _apply_options(options, _ASSUME_YES_OPTIONS)
+
+
+def local_export(
+    options: Callable[..., None],
+) -> Callable[..., None]:
+    """Extend CLI options with an optional save to disk command.
+
+    Args:
+        options: CLI options to extend.
+
+    Returns:
+        The extended options.
+    """
+    return _apply_options(options, _LOCAL_EXPORT_OPTIONS)
+
+
+def add_default_preservation_policy_option(
+    options: Callable[[KwArg(Any)], None],
+) -> Callable[..., None]:
+    """Extend CLI options.
+
+    Args:
+        options: CLI options to extend.
+
+    Returns:
+        The extended options.
+    """
+    return _apply_options(options, _PRESERVATION_POLICY_OPTIONS)
 
 
 @click.command()
@@ -286,13 +328,26 @@ def commandline_interface(**params) -> None:  # noqa: ANN003
     Args:
         **params: See the decorating functions.
     """
+    # Imported here to keep '--help' and argument errors free of the Gitlab stack
+    from gitlab_migration_helper.gitlab_utils import (
+        DELETION_WORKERS,
+        PAGE_WORKERS,
+        VARIABLE_WORKERS,
+        get_gitlab_group,
+    )
+    from gitlab_migration_helper.main import main
+    from gitlab_migration_helper.pruning import PreservationPolicy
+
     setup_logging()
     export_locally = params["export_locally"]
-    origin_gitlab = get_gitlab_instance(
-        gitlab_url=params["origin_gitlab"],
-        token=params["origin_token"],
-        certificate=params["origin_certificate"],
-        key=params["origin_key"],
+    # Every project worker may fan out into one of the inner thread pools
+    pool_maxsize = params["workers"] * max(
+        PAGE_WORKERS, DELETION_WORKERS, VARIABLE_WORKERS
+    )
+    origin_gitlab = connect_gitlab(
+        params=params,
+        prefix="origin",
+        pool_maxsize=pool_maxsize,
     )
 
     origin_group = get_gitlab_group(
@@ -303,11 +358,10 @@ def commandline_interface(**params) -> None:  # noqa: ANN003
     if export_locally:
         destination_group = None
     else:
-        destination_gitlab = get_gitlab_instance(
-            gitlab_url=params["destination_gitlab"],
-            token=params["destination_token"],
-            certificate=params["destination_certificate"],
-            key=params["destination_key"],
+        destination_gitlab = connect_gitlab(
+            params=params,
+            prefix="destination",
+            pool_maxsize=pool_maxsize,
         )
 
         destination_group = get_gitlab_group(
@@ -326,22 +380,66 @@ def commandline_interface(**params) -> None:  # noqa: ANN003
         origin_group=origin_group,
         destination_group=destination_group,
         include_archived_projects=params["include_archived"],
-        prompt_every_project=params["prompt"],
+        confirm_projects=params["prompt"],
         preservation_policy=preservation_policy,
         preserve_branches=params["preserve_branches"],
         exclude_subgroups=params["exclude_subgroups"],
         dry_run=not params["no_dry_run"],
         export_locally=export_locally,
         export_path=params["export_path"],
+        workers=params["workers"],
+        skip_ids=params["skip_ids"],
+        transfer_timeout=params["transfer_timeout"],
     )
 
 
+def connect_gitlab(
+    params: dict[str, Any],
+    prefix: Literal["origin", "destination"],
+    pool_maxsize: int,
+) -> "Gitlab":
+    """Connect to the origin or destination Gitlab instance given by the CLI.
+
+    Args:
+        params: The CLI parameters.
+        prefix: Selects the origin or destination parameters.
+        pool_maxsize: Maximum number of connections kept alive per host.
+
+    Returns:
+        Reference object to the authenticated Gitlab instance.
+
+    Raises:
+        click.BadParameter, if the certificate, key or token are not usable.
+    """
+    from gitlab import GitlabError
+
+    from gitlab_migration_helper.gitlab_utils import get_gitlab_instance
+
+    try:
+        return get_gitlab_instance(
+            gitlab_url=params[f"{prefix}_gitlab"],
+            token=params[f"{prefix}_token"],
+            certificate=params[f"{prefix}_certificate"],
+            key=params[f"{prefix}_key"],
+            pool_maxsize=pool_maxsize,
+        )
+    except (GitlabError, OSError) as e:
+        msg = f"Could not connect to the {prefix} Gitlab instance: {e}"
+        raise click.BadParameter(
+            msg,
+            param_hint=[
+                f"--{prefix}-{name}" for name in ("certificate", "key", "token")
+            ],
+        ) from e
+
+
+@functools.cache
 def attempt_coersion_to_int(
     group_id: str,
 ) -> str | int:
     """Coerces the provided group ID to integer.
 
-    If the coercion fails, a group name is assumed.
+    If the coercion fails, a group name is assumed. Results are cached.
 
     Args:
         group_id: Gitlab group ID or name.
@@ -353,7 +451,8 @@ def attempt_coersion_to_int(
         return int(group_id)
     except ValueError:
         logging.info(
-            f"Could not coerce '{group_id}' into an integer. Assuming a group name.",
+            "Could not coerce '%s' into an integer. Assuming a group name.",
+            group_id,
         )
         return group_id
 
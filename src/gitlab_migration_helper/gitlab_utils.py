@@ -1,56 +1,248 @@
 """General utilities to interact with Gitlab, i.e. instantiation of Groups."""
 
+import functools
+import itertools
 import logging
-from argparse import ArgumentError
+import ssl
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 import requests
 from gitlab import Gitlab
+from gitlab.base import RESTObject
 from gitlab.exceptions import (
     GitlabGetError,
 )
+from gitlab.mixins import ListMixin
 from gitlab.v4.objects import Group, Project
-
-from gitlab_migration_helper.pruning import validate_branch_list
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3 import PoolManager
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BRANCHES = ("main", "master")
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+CONDITIONAL_CACHE_SIZE = 256
+PAGE_SIZE = 100
+PAGE_WORKERS = 8
+DELETION_WORKERS = 8
+VARIABLE_WORKERS = 8
+
+
+class ConditionalGetAdapter(HTTPAdapter):
+    """HTTP adapter revalidating repeated GET requests with their last ETag.
+
+    Gitlab answers a GET carrying a matching 'If-None-Match' header with an empty
+    304 response. The adapter replays the cached body and headers as 200 response
+    in that case, so python-gitlab is not aware of the revalidation. This keeps
+    repeated polling of e.g. export and import states cheap. Streamed requests,
+    i.e. downloads, are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        *args: Any,  # noqa: ANN401
+        cache_size: int = CONDITIONAL_CACHE_SIZE,
+        ssl_context: ssl.SSLContext | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the adapter.
+
+        Args:
+            *args: Positional arguments of the HTTPAdapter.
+            cache_size: Maximum number of URLs to keep the last response of.
+            ssl_context: TLS context used for all connections of the adapter.
+            **kwargs: Keyword arguments of the HTTPAdapter.
+        """
+        # Needed by init_poolmanager, which is already called by the super init
+        self._ssl_context = ssl_context
+        super().__init__(*args, **kwargs)
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[str, bytes, dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_poolmanager(
+        self,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the pool manager, handing over the shared TLS context.
+
+        Args:
+            *args: Positional arguments of HTTPAdapter.init_poolmanager.
+            **kwargs: Keyword arguments of HTTPAdapter.init_poolmanager.
+        """
+        if self._ssl_context is not None:
+            kwargs["ssl_context"] = self._ssl_context
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(
+        self,
+        proxy: str,
+        **proxy_kwargs: Any,  # noqa: ANN401
+    ) -> PoolManager:
+        """Get the manager for a proxy, handing over the shared TLS context.
+
+        Without it, the client certificate would not be presented to the Gitlab
+        instance, when connecting through e.g. HTTPS_PROXY.
+
+        Args:
+            proxy: URL of the proxy.
+            **proxy_kwargs: Keyword arguments of HTTPAdapter.proxy_manager_for.
+
+        Returns:
+            The pool manager connecting through the proxy.
+        """
+        if self._ssl_context is not None:
+            proxy_kwargs.setdefault("ssl_context", self._ssl_context)
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> requests.Response:
+        """Send the request, revalidating cached GET responses.
+
+        Args:
+            request: The prepared request to send.
+            *args: Further positional arguments of HTTPAdapter.send.
+            **kwargs: Further keyword arguments of HTTPAdapter.send. The session
+                passes 'stream' as keyword.
+
+        Returns:
+            The response, replayed from the cache if not modified.
+        """
+        if request.method != "GET" or kwargs.get("stream") or request.url is None:
+            return super().send(request, *args, **kwargs)
+
+        url = request.url
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is not None:
+            request.headers["If-None-Match"] = cached[0]
+
+        response = super().send(request, *args, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            logger.debug("Not modified: %s", url)
+            # Reading the (empty) body releases the connection back to the pool
+            response.content  # noqa: B018
+            response.status_code = 200
+            response._content = cached[1]
+            response.headers = CaseInsensitiveDict(cached[2])
+            with self._lock:
+                self._cache.move_to_end(url)
+        elif response.status_code == 200 and (etag := response.headers.get("ETag")):
+            with self._lock:
+                self._cache[url] = (etag, response.content, dict(response.headers))
+                self._cache.move_to_end(url)
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return response
+
+
+@functools.cache
+def get_ssl_context(
+    certificate: str | None,
+    key: str | None,
+) -> ssl.SSLContext:
+    """Build the TLS context for a client certificate.
+
+    The context is built only once per certificate and key, so the PEM files are
+    parsed once and not for every new connection.
+
+    Args:
+        certificate: Client certificate to authenticate with, if any.
+        key: Respective key for the certificate.
+
+    Returns:
+        The TLS context verifying servers against the CA bundle of requests.
+    """
+    context = ssl.create_default_context(cafile=DEFAULT_CA_BUNDLE_PATH)
+    if certificate:
+        context.load_cert_chain(
+            certfile=certificate,
+            keyfile=key,
+        )
+    return context
+
 
 def get_gitlab_instance(
     gitlab_url: str,
     token: str,
     certificate: str,
     key: str,
+    pool_maxsize: int = POOL_MAXSIZE,
+    validate: bool = True,
 ) -> Gitlab:
     """Get a Gitlab instance.
 
+    The underlying session keeps a pool of connections alive, so that consecutive
+    API calls against the same host reuse the TCP and TLS connection. Transient
+    gateway errors are retried with a short backoff and repeated GET requests are
+    revalidated via ETag. The TLS context is shared between instances using the
+    same certificate.
+
     Args:
         gitlab_url: Address of the Gitlab instance to work against.
         token: Gitlab token.
         certificate: Sunray certificate necessary to reach the Gitlab instance.
         key: Respective key for the certificate.
+        pool_maxsize: Maximum number of connections kept alive per host. Should
+            cover the number of threads using the instance concurrently.
+        validate: If True, authenticate right away, so that invalid certificates or
+            tokens surface before any work is done.
 
     Returns:
         Reference object to the target Gitlab instance.
+
+    Raises:
+        OSError, if the certificate can't be loaded or the instance is unreachable.
+        GitlabAuthenticationError, if the token is rejected.
     """
     session = requests.Session()
-    session.cert = (
-        certificate,
-        key,
+    adapter = ConditionalGetAdapter(
+        ssl_context=get_ssl_context(certificate, key),
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False,
+        ),
     )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
 
-    return Gitlab(
+    gl = Gitlab(
         url=gitlab_url,
         private_token=token,
         session=session,
     )
+    if validate:
+        gl.auth()
+    return gl
 
 
+@functools.lru_cache(maxsize=64)
 def get_gitlab_group(
     gl: Gitlab,
     group_id: str | int,
 ) -> Group:
     """Produce the Gitlab group object associated with an ID or name.
 
+    Names are searched for on the server side. Results are cached per Gitlab
+    instance, so that repeated resolutions do not hit the API again.
+
     Args:
         gl: Gitlab object containing the group.
         group_id: ID (integer) or name of the group to be returned.
@@ -64,11 +256,17 @@ def get_gitlab_group(
     if isinstance(group_id, int):
         group = gl.groups.get(group_id)
     else:
-        available_groups = gl.groups.list(get_all=True)
+        # The search also matches partially, hence filter for the exact name
+        # and stop as soon as the name turns out to be ambiguous.
+        candidates = gl.groups.list(
+            search=group_id,
+            iterator=True,
+            per_page=100,
+        )
         match matching_groups := list(
-            filter(
-                lambda g: g.name == group_id,
-                available_groups,
+            itertools.islice(
+                filter(lambda g: g.name == group_id, candidates),
+                2,
             )
         ):
             case [single_group]:
@@ -81,6 +279,39 @@ def get_gitlab_group(
     return group
 
 
+def list_all_pages(
+    manager: ListMixin[Any],
+    **kwargs: Any,  # noqa: ANN401
+) -> list[RESTObject]:
+    """Retrieve all items of a listing, fetching its pages concurrently.
+
+    The first page reveals the total number of pages, the remaining ones are then
+    requested in parallel. If Gitlab omits the total, e.g. for listings of more than
+    10,000 items, the remaining pages are followed one after another instead.
+
+    Args:
+        manager: Manager of the listed resource, e.g. the pipelines of a project.
+        **kwargs: Filters and ordering passed on to the listing.
+
+    Returns:
+        The items of all pages in the order returned by Gitlab.
+    """
+    pages = manager.list(iterator=True, per_page=PAGE_SIZE, **kwargs)
+    items: list[RESTObject] = list(itertools.islice(pages, PAGE_SIZE))
+    total_pages = pages.total_pages
+    if total_pages is None or pages.current_page != 1:
+        items.extend(pages)
+        return items
+
+    def fetch_page(page: int) -> list[RESTObject]:
+        return manager.list(page=page, per_page=PAGE_SIZE, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        for page_items in executor.map(fetch_page, range(2, total_pages + 1)):
+            items.extend(page_items)
+    return items
+
+
 def get_rectified_branches_refs(
     project: Project,
     branches_to_validate: list[str],
@@ -88,6 +319,8 @@ def get_rectified_branches_refs(
 ) -> list[str]:
     """Validate a list of given branch names of a project removing non-existent ones.
 
+    The branches of the project are fetched only once for all names to validate.
+
     Args:
         project: Project supposedly holding the branches.
         branches_to_validate: Branch names to validate.
@@ -96,19 +329,25 @@ def get_rectified_branches_refs(
     Returns:
         The list of existing branches, plus defaults if parameterized.
     """
-    branch_ref_candidates = list(branches_to_validate)
-    branch_refs = []
-    for branch in branch_ref_candidates:
-        try:
-            branch_refs += validate_branch_list(
-                project=project,
-                branch=branch,
-            )
-        except ArgumentError:
-            logger.warning(
-                f"Omitting branch '{branch}' from protection list. Not existing."
-            )
+    existing_branches = {
+        branch.name
+        for branch in project.branches.list(
+            iterator=True,
+            per_page=100,
+        )
+    }
+    branch_refs = [b for b in branches_to_validate if b in existing_branches]
+    omitted_branches = [
+        b
+        for b in branches_to_validate
+        if b not in existing_branches and b not in DEFAULT_BRANCHES
+    ]
+    if omitted_branches:
+        logger.warning(
+            "Omitting branches %s from protection list. Not existing.",
+            omitted_branches,
+        )
     if extend_with_defaults:
         logger.debug("Adding also the default branches.")
-        branch_refs += ["main", "master"]
+        branch_refs.extend(DEFAULT_BRANCHES)
     return branch_refs
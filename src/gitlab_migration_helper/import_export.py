@@ -1,56 +1,116 @@
 """Wrappers to provide importing and exporting projects capability."""
 
-import io
 import logging
+import os
 import time
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tempfile import TemporaryDirectory
+from tempfile import TemporaryFile
 
-from gitlab import GitlabCreateError
+from gitlab import GitlabCreateError, GitlabGetError
+from gitlab.base import RESTObject
 from gitlab.v4.objects import Group, Project
 
+from gitlab_migration_helper.gitlab_utils import VARIABLE_WORKERS
+
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+EXPORT_BUFFER_SIZE = 8 * 1024 * 1024
+TRANSFER_TIMEOUT = 3600.0
+
+
+def _wait_until(
+    obj: RESTObject,
+    status_attribute: str,
+    terminal: tuple[str, ...] = ("finished",),
+    failed: tuple[str, ...] = ("failed",),
+    initial: float = 0.5,
+    cap: float = 15.0,
+    timeout: float = TRANSFER_TIMEOUT,
+) -> str:
+    """Poll a Gitlab object until its status reaches a terminal or failed state.
+
+    The delay between two refreshes doubles after each poll until it reaches the
+    cap, which keeps the number of requests low for long running jobs.
+
+    Args:
+        obj: Gitlab object providing the status, e.g. a project export or import.
+        status_attribute: Name of the attribute holding the status.
+        terminal: States signalling a successful completion.
+        failed: States signalling a failure.
+        initial: Initial delay between two polls in seconds.
+        cap: Maximum delay between two polls in seconds.
+        timeout: Maximum overall waiting time in seconds.
+
+    Returns:
+        The final status of the object.
+
+    Raises:
+        TimeoutError, if no terminal or failed state is reached within the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial
+    while (status := getattr(obj, status_attribute)) not in terminal + failed:
+        if time.monotonic() + delay > deadline:
+            msg = f"'{status_attribute}' still '{status}' after {timeout} seconds."
+            raise TimeoutError(msg)
+        logger.debug("Status '%s', polling again in %s seconds...", status, delay)
+        time.sleep(delay)
+        obj.refresh()
+        delay = min(cap, delay * 2)
+    return status
+
 
 def export_project_to_file(
     project: Project,
     file_descriptor: typing.BinaryIO,
+    timeout: float = TRANSFER_TIMEOUT,
 ) -> None:
     """Export a given Gitlab project into a file.
 
+    Gitlab has no dedicated failure state for exports. A failed export falls back
+    to the status 'none' instead.
+
     Args:
         project: The project to be exported.
-        file_descriptor: The file to write the content to.
+        file_descriptor: The file to write the content to. Named files have to end
+            on '.tgz', anonymous (e.g. temporary) files are accepted as well.
+        timeout: Maximum time in seconds to wait for the export to finish.
     """
-    if not file_descriptor.name.endswith(".tgz"):
-        msg = "The file to write to has end on '.tgz.' to recognized as proper "
+    file_name = getattr(file_descriptor, "name", None)
+    if isinstance(file_name, str) and not file_name.endswith(".tgz"):
+        msg = "The file to write to has to end on '.tgz' to be recognized as proper "
         msg += "Gitlab export file!\n"
-        msg += f"Provided file name: {file_descriptor.name}"
-        raise ValueError()
-    logger.info(
-        f"Attempting to export {project.path} into {file_descriptor.name}...",
-    )
+        msg += f"Provided file name: {file_name}"
+        raise ValueError(msg)
+    logger.info("Attempting to export %s...", project.path)
     export = project.exports.create()
 
     export.refresh()
-    while export.export_status != "finished":
-        logger.debug("Export ongoing...")
-        time.sleep(1)
-        export.refresh()
+    if (
+        _wait_until(export, "export_status", failed=("none",), timeout=timeout)
+        != "finished"
+    ):
+        raise GitlabGetError(f"Could not export the project {project.path}!")
 
     logger.info("Writing export back to file...")
     export.download(
         streamed=True,
         action=file_descriptor.write,
+        chunk_size=DOWNLOAD_CHUNK_SIZE,
+        # The archive is compressed already, avoid compressing it again in transit
+        extra_headers={"Accept-Encoding": "identity"},
     )
     logger.info("Export completed.")
 
 
 def import_project_from_file(
-    file_descriptor: io.BufferedReader,
+    file_descriptor: typing.BinaryIO,
     project: Project,
     group: Group,
+    timeout: float = TRANSFER_TIMEOUT,
 ) -> Project:
     """Import the project to a Gitlab group using its file content.
 
@@ -59,17 +119,20 @@ def import_project_from_file(
         project: Gitlab project to import. Needed for metadata.
         group: The destination group, under which the project is imported. Can be in
             a separate Gitlab instance.
+        timeout: Maximum time in seconds to wait for the import to finish.
 
     Returns:
         The project created in the destination group.
     """
     gl = group.manager.gitlab
 
-    msg = f"Attempting import of project '{project.name}' "
-    msg += f"stored in file '{file_descriptor.name}' into {group.full_path}..."
-    logger.info(msg)
+    logger.info(
+        "Attempting import of project '%s' into %s...",
+        project.name,
+        group.full_path,
+    )
     output = gl.projects.import_project(
-        file_descriptor,
+        file_descriptor,  # type: ignore[arg-type]
         namespace=group.full_path,
         path=project.path,
         name=project.name,
@@ -81,46 +144,96 @@ def import_project_from_file(
         lazy=True,
     )
     project_import = new_project.imports.get()
-    while project_import.import_status != "finished":
-        if project_import.import_status == "failed":
-            msg = "Could not import the project!\n"
-            msg += f"Error: {project_import.import_error}"
-            raise GitlabCreateError(msg)
-        logger.debug("Import ongoing...")
-        time.sleep(1)
-        project_import.refresh()
+    if _wait_until(project_import, "import_status", timeout=timeout) != "finished":
+        msg = "Could not import the project!\n"
+        msg += f"Error: {project_import.import_error}"
+        raise GitlabCreateError(msg)
 
     logger.info("Import completed.")
     return new_project
 
 
+def get_up_to_date_project(
+    project: Project,
+    destination_group: Group,
+) -> Project | None:
+    """Look up a previously migrated copy of the project in the destination group.
+
+    A copy counts as up-to-date, if it has the same path, its import finished and
+    the head commit of its default branch matches the one of the origin project.
+
+    Args:
+        project: Project from an origin Gitlab instance.
+        destination_group: Group in a destination Gitlab to look the copy up in.
+
+    Returns:
+        The up-to-date project in the destination group, None if there is none.
+    """
+    default_branch = project.default_branch
+    if default_branch is None:
+        return None
+
+    gl = destination_group.manager.gitlab
+    origin_head = None
+    for candidate in destination_group.projects.list(
+        search=project.path,
+        iterator=True,
+    ):
+        if candidate.path != project.path:
+            continue
+        destination_project = gl.projects.get(candidate.id, lazy=True)
+        try:
+            destination_head = destination_project.commits.get(default_branch).id
+        except GitlabGetError:
+            return None
+        if origin_head is None:
+            origin_head = project.commits.get(default_branch).id
+        if destination_head != origin_head:
+            continue
+        import_status = destination_project.imports.get().import_status
+        if import_status != "finished":
+            logger.warning(
+                "Import of %s in the destination is %s, migrating again.",
+                project.path,
+                import_status,
+            )
+            return None
+        return destination_project
+    return None
+
+
 def migrate_project(
     project: Project,
     destination_group: Group,
+    timeout: float = TRANSFER_TIMEOUT,
 ) -> Project:
     """Export a given Gitlab project and import it into the provided group.
 
     Project and group do not need to exist in the same Gitlab instance.
 
+    The export is written to an anonymous temporary file, which is removed right
+    after the upload. It is not kept in memory, as the multipart upload requires
+    a file descriptor of a real file anyway.
+
     Args:
         project: Project from an origin Gitlab instance.
         destination_group: Group in a destination Gitlab, where the project is to
             be imported to.
+        timeout: Maximum time in seconds to wait for each, the export and the import.
     """
-    with TemporaryDirectory() as temporary_directory:
-        file_path = Path(temporary_directory) / f"{project.path}.tgz"
-        with open(file_path, "wb") as file_descriptor:
-            export_project_to_file(
-                project=project,
-                file_descriptor=file_descriptor,
-            )
-
-        with open(file_path, "rb") as file_descriptor:
-            destination_project = import_project_from_file(
-                project=project,
-                file_descriptor=file_descriptor,
-                group=destination_group,
-            )
+    with TemporaryFile(mode="w+b") as file_descriptor:
+        export_project_to_file(
+            project=project,
+            file_descriptor=file_descriptor,
+            timeout=timeout,
+        )
+        file_descriptor.seek(0)
+        destination_project = import_project_from_file(
+            project=project,
+            file_descriptor=file_descriptor,
+            group=destination_group,
+            timeout=timeout,
+        )
     return destination_project
 
 
@@ -131,26 +244,35 @@ def copy_variables(
 ) -> None:
     """Copy CI/CD variables from one project to another.
 
+    The variables are created concurrently over the connection pool of the
+    destination Gitlab session.
+
     Args:
         origin_project: Holding the variables to copy.
         destination_project: Project to receive the copied variables.
         dry_run: Flag to only show information without actually copying anything.
     """
     logger.info("Copying variables from origin project to destination project.")
-    project_variables = origin_project.variables.list(get_all=True)
+    project_variables = origin_project.variables.list(get_all=True, per_page=100)
+    if not project_variables:
+        logger.debug("No variables to copy.")
+        return
     if dry_run:
-        logger.debug(
-            "The following variables would be copied:\n",
-            project_variables,
-        )
+        logger.debug("Would copy %d variables", len(project_variables))
     else:
-        for var in project_variables:
-            destination_project.variables.create(var._attrs)
+        with ThreadPoolExecutor(max_workers=VARIABLE_WORKERS) as executor:
+            list(
+                executor.map(
+                    lambda var: destination_project.variables.create(var._attrs),
+                    project_variables,
+                )
+            )
 
 
 def export_local(
     project: Project,
     export_path: Path,
+    timeout: float = TRANSFER_TIMEOUT,
 ) -> None:
     """Write Gitlab project to path project_root/exports at local disc.
 
@@ -161,6 +283,7 @@ def export_local(
     Args:
         project: Project from an origin Gitlab instance.
         export_path: Path, under which the project export is stored.
+        timeout: Maximum time in seconds to wait for the export to finish.
     """
     export_url = export_path / f"{project.path}.tgz"
     logger.info(
@@ -168,8 +291,16 @@ def export_local(
         project.name,
         export_url,
     )
-    with open(export_url, "wb") as file_descriptor:
+    with open(export_url, "wb", buffering=EXPORT_BUFFER_SIZE) as file_descriptor:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(
+                file_descriptor.fileno(),
+                0,
+                0,
+                os.POSIX_FADV_SEQUENTIAL,
+            )
         export_project_to_file(
             project=project,
             file_descriptor=file_descriptor,
+            timeout=timeout,
         )
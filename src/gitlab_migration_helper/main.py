@@ -1,15 +1,22 @@
 """Main module bringing the pruning and migration parts together."""
 
+import functools
 import logging
+from collections.abc import Collection, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import click
 from gitlab import Gitlab
-from gitlab.v4.objects import Group
+from gitlab.v4.objects import Group, GroupProject, Project
+from tabulate import tabulate
 
 from gitlab_migration_helper.gitlab_utils import get_rectified_branches_refs
 from gitlab_migration_helper.import_export import (
+    TRANSFER_TIMEOUT,
     copy_variables,
     export_local,
+    get_up_to_date_project,
     migrate_project,
 )
 from gitlab_migration_helper.pruning import (
@@ -29,12 +36,15 @@ def main(
     export_path: Path,
     destination_group: Group | None,
     include_archived_projects: bool,
-    prompt_every_project: bool,
+    confirm_projects: bool,
     preservation_policy: PreservationPolicy,
     preserve_branches: list[str],
     exclude_subgroups: bool,
     dry_run: bool = True,
     export_locally: bool = False,
+    workers: int = 4,
+    skip_ids: Collection[int] = (),
+    transfer_timeout: float = TRANSFER_TIMEOUT,
 ) -> None:
     """Core function executing the projects pruning and migration.
 
@@ -46,8 +56,8 @@ def main(
         destination_group: Destination group to migrate to.
         include_archived_projects: Flag to control, if archived projects should be
             included in the pruning and migration as well.
-        prompt_every_project: Flag to control, if every single project should be
-            prompted for pruning and migration..
+        confirm_projects: Flag to control, if the projects to prune and migrate are
+            listed and confirmed once before processing.
         preservation_policy: Preservation policy to apply to releases and pipelines
             pruning.
         preserve_branches: Branches, which should be exempted from deletion beyond
@@ -56,76 +66,164 @@ def main(
         dry_run: Flag to control, if the pruning and migration should actually execute.
             Default is to just show candidates.
         export_locally: Flag for exporting the projects to the local machine.
+        workers: Number of projects processed in parallel.
+        skip_ids: IDs of projects to leave out of the pruning and migration.
+        transfer_timeout: Maximum time in seconds to wait for each project export and
+            import.
     """
-    projects = list(
-        origin_group.projects.list(
-            get_all=True,
-            include_subgroups=not exclude_subgroups,
-            recursive=True,
+    # Archived projects are filtered by Gitlab already, if not included
+    archived_filter = {} if include_archived_projects else {"archived": False}
+
+    # Iterate page by page, so processing starts as soon as the first page arrives
+    projects: Iterable[GroupProject] = origin_group.projects.list(
+        iterator=True,
+        per_page=100,
+        include_subgroups=not exclude_subgroups,
+        recursive=True,
+        **archived_filter,
+    )
+    if skip_ids:
+        skip_id_set = frozenset(skip_ids)
+        projects = (p for p in projects if p.id not in skip_id_set)
+
+    if confirm_projects:
+        projects = list(projects)
+        plan = tabulate(
+            [(p.id, p.path_with_namespace, p.archived) for p in projects],
+            headers=["ID", "Project", "Archived"],
         )
+        click.echo_via_pager(plan)
+        if not click.confirm(f"Do you want to migrate these {len(projects)} projects?"):
+            logger.info("Migration aborted.")
+            return
+
+    process = functools.partial(
+        process_project,
+        origin_gitlab=origin_gitlab,
+        export_path=export_path,
+        destination_group=destination_group,
+        preservation_policy=preservation_policy,
+        preserve_branches=preserve_branches,
+        dry_run=dry_run,
+        export_locally=export_locally,
+        transfer_timeout=transfer_timeout,
     )
 
-    for group_project in projects:
-        project = origin_gitlab.projects.get(
-            group_project.id,
-            statistics=True,
-        )
-        if project.archived and not include_archived_projects:
-            continue
-
-        logger.info(f"Processing project {project.name} ({project.id})...")
-
-        msg = f"Do you want to migrate the project {project.name}? (y/n)"
-        if prompt_every_project:
-            answer = input(msg).lower()
-            if answer not in ["n", "y"]:
-                KeyError("Invalid answer option! Must be one of ['n', 'N', 'y', 'Y']!")
-            if answer == "n" or answer == "":
-                continue
-
-        exclude_branch_refs = get_rectified_branches_refs(
-            project=project,
-            branches_to_validate=preserve_branches,
-        )
+    if workers == 1:
+        for group_project in projects:
+            process(group_project=group_project)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process, group_project=group_project): group_project
+            for group_project in projects
+        }
+        try:
+            for future in as_completed(futures):
+                group_project = futures[future]
+                try:
+                    future.result()
+                except Exception:
+                    logger.error(
+                        "Processing project %s failed. Aborting...",
+                        group_project.name,
+                    )
+                    raise
+                logger.info("Finished project %s.", group_project.name)
+        except BaseException:
+            # also on Ctrl-C, so no queued project starts after the abort
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def process_project(
+    origin_gitlab: Gitlab,
+    group_project: GroupProject,
+    export_path: Path,
+    destination_group: Group | None,
+    preservation_policy: PreservationPolicy,
+    preserve_branches: list[str],
+    dry_run: bool = True,
+    export_locally: bool = False,
+    transfer_timeout: float = TRANSFER_TIMEOUT,
+) -> None:
+    """Prune and migrate a single project.
 
-        delete_non_protected_branch_pipelines(
-            project=project,
-            exclude_branch_refs=exclude_branch_refs,
-            dry_run=dry_run,
-        )
+    Args:
+        origin_gitlab: Instance from where to migrate. Needed for the pruning.
+        group_project: Project as listed in the origin group.
+        export_path: Local path where to export the project, if export_local is True.
+        destination_group: Destination group to migrate to.
+        preservation_policy: Preservation policy to apply to releases and pipelines
+            pruning.
+        preserve_branches: Branches, which should be exempted from deletion beyond
+            'main' and 'master'.
+        dry_run: Flag to control, if the pruning and migration should actually execute.
+        export_locally: Flag for exporting the project to the local machine.
+        transfer_timeout: Maximum time in seconds to wait for the export and import.
+    """
+    # The listed attributes suffice, so skip the additional GET of the project
+    project = Project(
+        manager=origin_gitlab.projects,
+        attrs=group_project.attributes,
+    )
 
-        delete_branches(
-            project=project,
-            exclude_branch_refs=exclude_branch_refs,
-            dry_run=dry_run,
-        )
+    logger.info("Processing project %s (%s)...", project.name, project.id)
 
-        delete_pipelines(
-            project=project,
-            preservation_policy=preservation_policy,
-            dry_run=dry_run,
-        )
+    exclude_branch_refs = get_rectified_branches_refs(
+        project=project,
+        branches_to_validate=preserve_branches,
+    )
 
-        delete_releases(
-            project=project,
-            preservation_policy=preservation_policy,
-            dry_run=dry_run,
-        )
+    delete_non_protected_branch_pipelines(
+        project=project,
+        exclude_branch_refs=exclude_branch_refs,
+        dry_run=dry_run,
+    )
+
+    delete_branches(
+        project=project,
+        exclude_branch_refs=exclude_branch_refs,
+        dry_run=dry_run,
+    )
+
+    delete_pipelines(
+        project=project,
+        preservation_policy=preservation_policy,
+        dry_run=dry_run,
+    )
+
+    delete_releases(
+        project=project,
+        preservation_policy=preservation_policy,
+        dry_run=dry_run,
+    )
 
-        if not dry_run:
-            if export_locally:
-                export_local(
-                    project=project,
-                    export_path=export_path,
-                )
-
-            if isinstance(destination_group, Group):
-                destination_project = migrate_project(
-                    project=project,
-                    destination_group=destination_group,
-                )
-                copy_variables(
-                    origin_project=project,
-                    destination_project=destination_project,
-                    dry_run=dry_run,  # note DB: dry_run will always be False here?
-                )
+    if not dry_run:
+        if export_locally:
+            export_local(
+                project=project,
+                export_path=export_path,
+                timeout=transfer_timeout,
+            )
+
+        if isinstance(destination_group, Group):
+            up_to_date_project = get_up_to_date_project(
+                project=project,
+                destination_group=destination_group,
+            )
+            if up_to_date_project is not None:
+                logger.info("Project %s is up-to-date, skipping.", project.name)
+                return
+
+            destination_project = migrate_project(
+                project=project,
+                destination_group=destination_group,
+                timeout=transfer_timeout,
+            )
+            copy_variables(
+                origin_project=project,
+                destination_project=destination_project,
+                dry_run=dry_run,  # note DB: dry_run will always be False here?
+            )
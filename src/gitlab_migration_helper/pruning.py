@@ -1,16 +1,147 @@
 """Components to prune Gitlab releases, pipelines and branches."""
 
+import functools
+import itertools
 import logging
 from argparse import ArgumentError
-from datetime import datetime, timedelta
-from typing import Annotated, Literal, Self
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from typing import Annotated, Any, Literal, Self, TypeVar
 
+import requests
+from gitlab import Gitlab
 from gitlab.base import RESTObject
+from gitlab.exceptions import GitlabDeleteError, GitlabError
 from gitlab.v4.objects import Project, ProjectPipelineManager, ProjectReleaseManager
-from pydantic import BaseModel, Field, computed_field, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    computed_field,
+    field_validator,
+    model_validator,
+)
+
+from gitlab_migration_helper.gitlab_utils import (
+    DEFAULT_BRANCHES,
+    DELETION_WORKERS,
+    list_all_pages,
+)
 
 logger = logging.getLogger(__name__)
 
+PIPELINE_DELETION_BATCH_SIZE = 20
+
+T = TypeVar("T")
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_created_at(created_at: str) -> datetime:
+    """Parse the 'created_at' timestamp of a Gitlab resource.
+
+    Gitlab returns UTC timestamps like '2024-03-04T11:22:33.123Z', which are parsed
+    into timezone aware datetimes. Results are cached, as pipelines triggered
+    together share their timestamps.
+
+    Args:
+        created_at: The ISO 8601 timestamp as returned by the API.
+
+    Returns:
+        The parsed timestamp.
+    """
+    return datetime.fromisoformat(created_at)
+
+
+def _delete_concurrently(
+    candidates: Iterable[T],
+    delete: Callable[[T], None],
+) -> None:
+    """Delete the candidates on a bounded thread pool.
+
+    python-gitlab already waits and retries, if Gitlab answers with 429 (too many
+    requests), so the pool size is the only throttle needed here.
+
+    Args:
+        candidates: Pipelines, releases or branches, or batches thereof, to delete.
+        delete: Deletes a single candidate.
+    """
+    with ThreadPoolExecutor(max_workers=DELETION_WORKERS) as executor:
+        # consuming the results re-raises the first failed deletion
+        list(executor.map(delete, candidates))
+
+
+def _delete_pipeline(pipeline: RESTObject) -> None:
+    logger.debug("Deleting pipeline: %s...", pipeline.id)
+    try:
+        pipeline.delete()
+    except GitlabDeleteError as e:
+        # e.g. removed by a bulk request, which failed only after deleting it
+        if e.response_code != 404:
+            raise
+        logger.debug("Pipeline %s is already deleted.", pipeline.id)
+
+
+def _delete_pipeline_batch(gitlab: Gitlab, pipelines: list[RESTObject]) -> None:
+    """Delete a batch of pipelines with a single GraphQL request.
+
+    Each pipeline gets its own aliased 'pipelineDestroy' mutation. Pipelines, which
+    could not be deleted that way, are deleted one by one via the REST API. As a
+    failed request may still have deleted some of them, pipelines not found there
+    count as deleted.
+
+    Args:
+        gitlab: Gitlab instance holding the pipelines.
+        pipelines: Pipelines to delete.
+    """
+    logger.debug("Deleting %s pipelines in one request...", len(pipelines))
+    mutations = " ".join(
+        f'p{i}: pipelineDestroy(input: {{id: "gid://gitlab/Ci::Pipeline/{p.id}"}}) '
+        "{ errors }"
+        for i, p in enumerate(pipelines)
+    )
+    data: dict[str, Any] = {}
+    try:
+        result = gitlab.http_post(
+            f"{gitlab.url}/api/graphql",
+            post_data={"query": f"mutation {{ {mutations} }}"},
+        )
+        if isinstance(result, dict):
+            data = result.get("data") or {}
+    except (GitlabError, requests.RequestException) as e:
+        logger.debug("Bulk deletion failed, falling back to single requests: %s", e)
+    for i, pipeline in enumerate(pipelines):
+        outcome = data.get(f"p{i}")
+        if outcome is None or outcome.get("errors"):
+            _delete_pipeline(pipeline)
+
+
+def _bulk_delete_pipelines(project: Project, pipelines: list[RESTObject]) -> None:
+    """Delete pipelines in concurrent batches of PIPELINE_DELETION_BATCH_SIZE.
+
+    Args:
+        project: Project holding the pipelines.
+        pipelines: Pipelines to delete.
+    """
+    batches = [
+        pipelines[i : i + PIPELINE_DELETION_BATCH_SIZE]
+        for i in range(0, len(pipelines), PIPELINE_DELETION_BATCH_SIZE)
+    ]
+    _delete_concurrently(
+        batches,
+        functools.partial(_delete_pipeline_batch, project.manager.gitlab),
+    )
+
+
+def _delete_release(project: Project, release: RESTObject) -> None:
+    logger.debug("Deleting releases: %s...", release.encoded_id)
+    project.releases.delete(release.tag_name)
+
+
+def _delete_branch(branch: RESTObject) -> None:
+    logger.debug("Deleting branch '%s'...", branch.name)
+    branch.delete()
+
 
 class PreservationPolicy(BaseModel):
     """Configuration holding the limitation date or number of preserved items.
@@ -27,24 +158,26 @@ class PreservationPolicy(BaseModel):
     policy to prevent confusion.
     """
 
-    retain_number_of_instances: Annotated[int, Field(gt=0)] | None = Field(
-        None,
-        frozen=True,
-    )
-    maximum_age_in_days: Annotated[int, Field(ge=0)] | None = Field(
-        None,
-        frozen=True,
-    )
-    minimum_creation_date: datetime | None = Field(
-        None,
-        frozen=True,
-    )
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    retain_number_of_instances: Annotated[int, Field(gt=0)] | None = None
+    maximum_age_in_days: Annotated[int, Field(ge=0)] | None = None
+    minimum_creation_date: datetime | None = None
+
+    @field_validator("minimum_creation_date")
+    @classmethod
+    def __to_utc(cls, value: datetime | None) -> datetime | None:
+        # naive dates, e.g. from the command line, are taken as local time
+        return value.astimezone(UTC) if value is not None else None
 
     @computed_field
-    @property
+    @functools.cached_property
     def minimum_allowed_created_at(self) -> datetime | None:
         """Gets the younger of provided dates from minimum_creation_date and max_age.
 
+        The date is computed in UTC on first access and kept for the lifetime of the
+        policy, so all candidates of a run are compared against the same cutoff.
+
         Returns:
             The resulting date.
         """
@@ -52,11 +185,11 @@ class PreservationPolicy(BaseModel):
         minimum_date_given = self.minimum_creation_date is not None
 
         if maximum_age_given and minimum_date_given:
-            today = datetime.today()
+            today = datetime.now(UTC)
             maximum_age_date = today - timedelta(days=self.maximum_age_in_days)  # type: ignore[arg-type]
             return max(maximum_age_date, self.minimum_creation_date)
         elif maximum_age_given:
-            today = datetime.today()
+            today = datetime.now(UTC)
             return today - timedelta(days=self.maximum_age_in_days)  # type: ignore[arg-type]
         elif minimum_date_given:
             return self.minimum_creation_date
@@ -103,13 +236,12 @@ def delete_pipelines(
         candidate_type="pipeline",
     )
 
-    msg = f"The oldest {len(pipelines_to_delete)} pipelines are candidates for"
-    msg += " deletion..."
-    logger.debug(msg)
+    logger.debug(
+        "The oldest %s pipelines are candidates for deletion...",
+        len(pipelines_to_delete),
+    )
     if not dry_run:
-        for pipeline in pipelines_to_delete:
-            logger.debug(f"Deleting pipeline: {pipeline.id}...")
-            pipeline.delete()
+        _bulk_delete_pipelines(project, pipelines_to_delete)
     logger.info("Pipelines deletion done.")
 
 
@@ -120,8 +252,12 @@ def extract_deletion_candidates(
 ) -> list[RESTObject]:
     """Extract deletion candidates from the project's pipelines and releases.
 
-    If <retain_latest_pipelines> is provided, the filter by <latest_creation_date> is
-    fully ignored.
+    If <retain_number_of_instances> is provided, the filter by
+    <minimum_allowed_created_at> is fully ignored.
+
+    Items are not sorted on the client side, Gitlab returns them ordered instead:
+    newest first to skip the retained ones, oldest first for the age-based filter,
+    which stops paging at the first item to keep.
 
     Args:
         project: Project holding the pipelines or releases.
@@ -135,39 +271,32 @@ def extract_deletion_candidates(
     match candidate_type:
         case "pipeline":
             base = project.pipelines
+            # pipeline IDs are handed out in order of creation
+            order_by = "id"
         case "release":
             base = project.releases
+            order_by = "created_at"
         case _:
             raise ValueError("Invalid candidate type!")
 
-    dt_format = "%Y-%m-%dT%H:%M:%S.%fZ"
-    all_candidates = sorted(  # noqa: C414
-        list(
-            base.list(
-                iterator=True,
-                per_page=100,
-            )
-        ),
-        key=lambda x: datetime.strptime(
-            x.created_at,
-            dt_format,
-        ),
-        reverse=True,
-    )
-    deletion_candidates = []
     if preservation_policy.retain_number_of_instances is not None:
-        number_of_instances = preservation_policy.retain_number_of_instances
-        if number_of_instances < len(all_candidates):
-            deletion_candidates = all_candidates[number_of_instances:]
-    else:
-        for candidate in all_candidates:
-            candidate_created_at = datetime.strptime(
-                candidate.created_at,
-                dt_format,
-            )
-            if candidate_created_at < preservation_policy.minimum_allowed_created_at:  # type: ignore[operator]
-                deletion_candidates.append(candidate)
-    return deletion_candidates
+        newest_first = list_all_pages(base, order_by=order_by, sort="desc")
+        return newest_first[preservation_policy.retain_number_of_instances :]
+
+    # oldest first, so paging stops at the first candidate to be kept
+    cutoff = preservation_policy.minimum_allowed_created_at
+    oldest_first = base.list(
+        iterator=True,
+        per_page=100,
+        order_by=order_by,
+        sort="asc",
+    )
+    return list(
+        itertools.takewhile(
+            lambda x: _parse_created_at(x.created_at) < cutoff,  # type: ignore[operator]
+            oldest_first,
+        )
+    )
 
 
 def delete_non_protected_branch_pipelines(
@@ -190,32 +319,25 @@ def delete_non_protected_branch_pipelines(
         project=project,
     )
 
-    pipelines = list(
-        project.pipelines.list(
-            iterator=True,
-            per_page=100,
-        )
-    )
-
-    logger.info(f"Searching for pipelines in branches != {exclude_branch_refs}...")
-    deletion_candidates = filter(
-        lambda x: x.ref not in protected_list,
-        pipelines,
-    )
+    logger.info("Searching for pipelines in branches != %s...", exclude_branch_refs)
+    protected_refs = set(protected_list)
+    deletion_candidates = [
+        p for p in list_all_pages(project.pipelines) if p.ref not in protected_refs
+    ]
     logger.debug(
-        f"Identified {len(list(deletion_candidates))} candidates for deletion.",
+        "Identified %s candidates for deletion.",
+        len(deletion_candidates),
     )
 
     if not dry_run:
-        for pipeline in deletion_candidates:
-            logger.debug(f"Deleting pipeline: {pipeline.id}...")
-            pipeline.delete()
+        _bulk_delete_pipelines(project, deletion_candidates)
     logger.info("Pipelines deletion done.")
 
 
 def validate_branch_list(
     branch: str | list[str],
     project: Project,
+    existing_branches: set[str] | None = None,
 ) -> list[str]:
     """Assert that the branch or branches exist, and coerce them into a list.
 
@@ -225,6 +347,8 @@ def validate_branch_list(
     Args:
         branch: Single branch name or list of branch names.
         project: Gitlab project holding the branches.
+        existing_branches: Names of the project's branches, if already fetched by the
+            caller. Otherwise they are listed from the project.
 
     Returns:
         The branch or branches as a list.
@@ -241,26 +365,28 @@ def validate_branch_list(
         )
     branch_list: list[str] = [branch] if isinstance(branch, str) else branch
 
-    existing_branches = []
-    for candidate in list(
-        project.branches.list(
-            iterator=True,
-            per_page=100,
-        )
-    ):
-        existing_branches.append(candidate.name)
-    for b in list(branch_list):  # list needed to the remove work
-        if b not in existing_branches:
-            if b in ["main", "master"]:
-                branch_list.remove(b)
-                continue
-            msg = f"The branch name '{b}' could not be found in the refs:\n"
-            msg += str(existing_branches)
-            raise ArgumentError(
-                argument=None,
-                message=msg,
+    if existing_branches is None:
+        # only the names are kept, so stream the branches instead of collecting them
+        existing_branches = {
+            candidate.name
+            for candidate in project.branches.list(
+                iterator=True,
+                per_page=100,
             )
-    return branch_list
+        }
+    missing_branches = [
+        b
+        for b in branch_list
+        if b not in existing_branches and b not in DEFAULT_BRANCHES
+    ]
+    if missing_branches:
+        msg = f"The branch name '{missing_branches[0]}' could not be found in the "
+        msg += f"refs:\n{sorted(existing_branches)}"
+        raise ArgumentError(
+            argument=None,
+            message=msg,
+        )
+    return [b for b in branch_list if b in existing_branches]
 
 
 def delete_releases(
@@ -288,13 +414,14 @@ def delete_releases(
         candidate_type="release",
     )
 
-    msg = f"The oldest {len(releases_to_delete)} releases are candidates for"
-    msg += " deletion..."
-    logger.info(msg)
+    logger.info(
+        "The oldest %s releases are candidates for deletion...",
+        len(releases_to_delete),
+    )
     if not dry_run:
-        for release in releases_to_delete:
-            logger.debug(f"Deleting releases: {release.encoded_id}...")
-            project.releases.delete(release.tag_name)
+        _delete_concurrently(
+            releases_to_delete, functools.partial(_delete_release, project)
+        )
     logger.info("Releases deletion done.")
 
 
@@ -318,27 +445,19 @@ def delete_branches(
         exclude_branch_refs = ["main", "master"]
 
     logger.info("Looking for branches to delete...")
-    protected_branches = validate_branch_list(
-        branch=exclude_branch_refs,
-        project=project,
-    )
-
-    all_branches = list(
-        project.branches.list(
-            iterator=True,
-            per_page=100,
+    all_branches = list_all_pages(project.branches)
+    protected_branches = set(
+        validate_branch_list(
+            branch=exclude_branch_refs,
+            project=project,
+            existing_branches={b.name for b in all_branches},
         )
     )
 
-    deletion_candidates = []
-    for b in all_branches:
-        if b.name not in protected_branches:
-            deletion_candidates.append(b)
+    deletion_candidates = [b for b in all_branches if b.name not in protected_branches]
 
-    logger.debug(f"The following branches would be deleted:\n {deletion_candidates}")
+    logger.debug("The following branches would be deleted:\n %s", deletion_candidates)
 
     if not dry_run:
-        for branch in deletion_candidates:
-            logger.debug(f"Deleting branch '{b.name}'...")
-            branch.delete()
+        _delete_concurrently(deletion_candidates, _delete_branch)
     logger.info("Branch deletion done.")
@@ -0,0 +1,21 @@
+# ruff: noqa: ANN001, ANN201, D100, D103
+
+import pytest
+
+from gitlab_migration_helper.cli import attempt_coersion_to_int
+
+
+@pytest.mark.parametrize(
+    ("group_id", "expected"),
+    [
+        ("1042", 1042),
+        (" 1042 ", 1042),
+        ("+5", 5),
+        ("-5", -5),
+        ("1_000", 1000),
+        ("my-group", "my-group"),
+        ("²", "²"),
+    ],
+)
+def test_attempt_coersion_to_int(group_id, expected):
+    assert attempt_coersion_to_int(group_id) == expected
@@ -1,8 +1,15 @@
 # ruff: noqa: ANN001, ANN201, D100, D103
 
+import http.server
 import os
+import ssl
+import threading
+from collections.abc import Iterator
 
 import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
 from gitlab_migration_helper import gitlab_utils as na
 
@@ -48,3 +55,136 @@ def test_get_destination_gitlab_instance():
 
     # then
     assert gitlab_instance.api_url == f"{url}/api/v4"
+
+
+def _response(status_code, content=b"", headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers or {})
+    return response
+
+
+def test_conditional_get_adapter_replays_not_modified(monkeypatch):
+    # given
+    sent_headers = []
+    responses = iter(
+        [
+            _response(
+                200,
+                b'{"export_status": "started"}',
+                {"ETag": 'W/"abc"', "Content-Type": "application/json"},
+            ),
+            _response(304, headers={"ETag": 'W/"abc"'}),
+        ]
+    )
+
+    def send(_adapter, request, *_args, **_kwargs) -> requests.Response:  # noqa: ANN002, ANN003
+        sent_headers.append(dict(request.headers))
+        return next(responses)
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    adapter = na.ConditionalGetAdapter()
+    request = requests.Request("GET", "https://gitlab.example/api/v4/x").prepare()
+
+    # when
+    adapter.send(request, stream=False)
+    response = adapter.send(request, stream=False)
+
+    # then
+    assert "If-None-Match" not in sent_headers[0]
+    assert sent_headers[1]["If-None-Match"] == 'W/"abc"'
+    assert response.status_code == 200
+    assert response.json() == {"export_status": "started"}
+    assert response.headers["Content-Type"] == "application/json"
+
+
+def test_conditional_get_adapter_hands_ssl_context_to_proxies():
+    # given
+    context = ssl.create_default_context()
+    adapter = na.ConditionalGetAdapter(ssl_context=context)
+
+    # when
+    direct = adapter.poolmanager
+    proxied = adapter.proxy_manager_for("http://proxy.example:3128")
+
+    # then
+    assert direct.connection_pool_kw["ssl_context"] is context
+    assert proxied.connection_pool_kw["ssl_context"] is context
+
+
+class _Listing:
+    current_page = 1
+
+    def __init__(self, pages: list[list[int]]) -> None:
+        self.total_pages = len(pages)
+        self._items = iter(pages[0])
+
+    def __iter__(self) -> Iterator[int]:
+        return self._items
+
+
+class _PagedManager:
+    def __init__(self, pages: list[list[int]]) -> None:
+        self.pages = pages
+
+    def list(self, iterator=False, page=1, **_kwargs):  # noqa: ANN003, ANN202
+        if iterator:
+            return _Listing(self.pages)
+        return self.pages[page - 1]
+
+
+def test_list_all_pages_concatenates_pages_in_order(monkeypatch):
+    # given
+    monkeypatch.setattr(na, "PAGE_SIZE", 2)
+    manager = _PagedManager([[1, 2], [3, 4], [5]])
+
+    # when
+    items = na.list_all_pages(manager)
+
+    # then
+    assert items == [1, 2, 3, 4, 5]
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self) -> None:
+        type(self).connections += 1
+        super().setup()
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.headers.get("If-None-Match") == '"abc"':
+            self.send_response(304)
+            self.send_header("ETag", '"abc"')
+            self.end_headers()
+            return
+        body = b'{"import_status": "started"}'
+        self.send_response(200)
+        self.send_header("ETag", '"abc"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args) -> None:  # noqa: ANN002
+        pass
+
+
+def test_conditional_get_adapter_releases_not_modified_connections():
+    # given
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    session.mount("http://", na.ConditionalGetAdapter())
+    url = f"http://127.0.0.1:{server.server_address[1]}/status"
+
+    # when
+    responses = [session.get(url) for _ in range(10)]
+    server.shutdown()
+    server.server_close()
+
+    # then
+    assert all(r.json() == {"import_status": "started"} for r in responses)
+    assert _ETagHandler.connections == 1
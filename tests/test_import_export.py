@@ -0,0 +1,168 @@
+# ruff: noqa: ANN001, ANN201, D100, D101, D102, D103, D107
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from gitlab.exceptions import GitlabGetError
+
+from gitlab_migration_helper import import_export as ie
+
+
+class FakeExport:
+    def __init__(self, states) -> None:
+        self._states = iter(states)
+        self.export_status = next(self._states)
+        self.refresh_count = 0
+
+    def refresh(self):
+        self.refresh_count += 1
+        self.export_status = next(self._states)
+
+
+def test_wait_until_backs_off_exponentially(monkeypatch):
+    # given
+    delays = []
+    monkeypatch.setattr(ie.time, "sleep", delays.append)
+    export = FakeExport(["queued", "started", "started", "started", "finished"])
+
+    # when
+    status = ie._wait_until(export, "export_status", initial=0.5, cap=1.5)
+
+    # then
+    assert status == "finished"
+    assert export.refresh_count == 4
+    assert delays == [0.5, 1.0, 1.5, 1.5]
+
+
+def test_wait_until_returns_failed_state(monkeypatch):
+    # given
+    monkeypatch.setattr(ie.time, "sleep", lambda _: None)
+    export = FakeExport(["queued", "failed"])
+
+    # then
+    assert ie._wait_until(export, "export_status") == "failed"
+
+
+def test_wait_until_raises_on_timeout(monkeypatch):
+    # given
+    monkeypatch.setattr(ie.time, "sleep", lambda _: None)
+    export = FakeExport(["queued"])
+
+    # then
+    with pytest.raises(TimeoutError):
+        ie._wait_until(export, "export_status", initial=2.0, timeout=1.0)
+
+
+def test_export_project_to_file_raises_when_export_falls_back_to_none(monkeypatch):
+    # given
+    monkeypatch.setattr(ie.time, "sleep", lambda _: None)
+    export = FakeExport(["queued", "started", "none"])
+    project = SimpleNamespace(
+        path="project",
+        exports=SimpleNamespace(create=lambda: export),
+    )
+
+    # then
+    with pytest.raises(ie.GitlabGetError):
+        ie.export_project_to_file(project, io.BytesIO())
+    assert export.export_status == "none"
+
+
+class FakeCommits:
+    def __init__(self, heads) -> None:
+        self.heads = heads
+
+    def get(self, ref):
+        if ref not in self.heads:
+            raise GitlabGetError("404 Branch Not Found", response_code=404)
+        return SimpleNamespace(id=self.heads[ref])
+
+
+def _origin_project(default_branch="main", head="abc") -> SimpleNamespace:
+    return SimpleNamespace(
+        path="project",
+        default_branch=default_branch,
+        commits=FakeCommits({"main": head}),
+    )
+
+
+def _destination_group(
+    candidates, heads_by_id, import_status="finished"
+) -> SimpleNamespace:
+    imports = SimpleNamespace(get=lambda: SimpleNamespace(import_status=import_status))
+    projects = {
+        project_id: SimpleNamespace(
+            id=project_id, commits=FakeCommits(heads), imports=imports
+        )
+        for project_id, heads in heads_by_id.items()
+    }
+    gitlab = SimpleNamespace(
+        projects=SimpleNamespace(get=lambda project_id, **_: projects[project_id])
+    )
+    return SimpleNamespace(
+        manager=SimpleNamespace(gitlab=gitlab),
+        projects=SimpleNamespace(list=lambda **_: iter(candidates)),
+    )
+
+
+def test_get_up_to_date_project_matches_exact_path_only():
+    # given
+    group = _destination_group(
+        candidates=[
+            SimpleNamespace(id=1, path="project-old"),
+            SimpleNamespace(id=2, path="project"),
+        ],
+        heads_by_id={1: {"main": "abc"}, 2: {"main": "abc"}},
+    )
+
+    # when
+    up_to_date = ie.get_up_to_date_project(_origin_project(), group)
+
+    # then
+    assert up_to_date.id == 2
+
+
+def test_get_up_to_date_project_ignores_outdated_copy():
+    # given
+    group = _destination_group(
+        candidates=[SimpleNamespace(id=2, path="project")],
+        heads_by_id={2: {"main": "old"}},
+    )
+
+    # then
+    assert ie.get_up_to_date_project(_origin_project(), group) is None
+
+
+def test_get_up_to_date_project_without_default_branch():
+    # given
+    group = _destination_group(
+        candidates=[SimpleNamespace(id=2, path="project")],
+        heads_by_id={2: {"main": "abc"}},
+    )
+
+    # then
+    assert ie.get_up_to_date_project(_origin_project(None), group) is None
+
+
+def test_get_up_to_date_project_destination_lacks_branch():
+    # given
+    group = _destination_group(
+        candidates=[SimpleNamespace(id=2, path="project")],
+        heads_by_id={2: {"develop": "abc"}},
+    )
+
+    # then
+    assert ie.get_up_to_date_project(_origin_project(), group) is None
+
+
+def test_get_up_to_date_project_ignores_failed_import():
+    # given
+    group = _destination_group(
+        candidates=[SimpleNamespace(id=2, path="project")],
+        heads_by_id={2: {"main": "abc"}},
+        import_status="failed",
+    )
+
+    # then
+    assert ie.get_up_to_date_project(_origin_project(), group) is None
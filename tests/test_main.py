@@ -0,0 +1,96 @@
+# ruff: noqa: ANN001, ANN003, ANN201, D100, D103
+
+import _thread
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from gitlab_migration_helper import main as main_module
+
+
+def _origin_group(number_of_projects) -> SimpleNamespace:
+    projects = [
+        SimpleNamespace(id=i, name=f"project-{i}") for i in range(number_of_projects)
+    ]
+    return SimpleNamespace(projects=SimpleNamespace(list=lambda **_: iter(projects)))
+
+
+def _run_main(origin_group, workers) -> None:
+    main_module.main(
+        origin_gitlab=None,
+        origin_group=origin_group,
+        export_path=None,
+        destination_group=None,
+        include_archived_projects=False,
+        confirm_projects=False,
+        preservation_policy=None,
+        preserve_branches=[],
+        exclude_subgroups=False,
+        workers=workers,
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_main_processes_all_projects(monkeypatch, workers):
+    # given
+    processed = []
+    monkeypatch.setattr(
+        main_module,
+        "process_project",
+        lambda group_project, **_: processed.append(group_project.id),
+    )
+
+    # when
+    _run_main(_origin_group(10), workers=workers)
+
+    # then
+    assert sorted(processed) == list(range(10))
+
+
+def test_main_cancels_pending_projects_on_first_failure(monkeypatch):
+    # given
+    started = []
+    failing = threading.Event()
+
+    def process_project(group_project, **_) -> None:
+        started.append(group_project.id)
+        if group_project.id == 0:
+            failing.set()
+            raise RuntimeError("boom")
+        # keep the workers busy, until the failure is handled
+        failing.wait(timeout=5)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(main_module, "process_project", process_project)
+
+    # then
+    with pytest.raises(RuntimeError, match="boom"):
+        _run_main(_origin_group(10), workers=2)
+    assert len(started) <= 3
+    assert 9 not in started
+
+
+def test_main_cancels_pending_projects_on_interrupt(monkeypatch):
+    # given
+    started = []
+    interrupted = threading.Event()
+
+    def process_project(group_project, **_) -> None:
+        started.append(group_project.id)
+        if group_project.id == 0:
+            # let the main thread submit all projects first
+            time.sleep(0.1)
+            interrupted.set()
+            _thread.interrupt_main()
+            return
+        interrupted.wait(timeout=5)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(main_module, "process_project", process_project)
+
+    # then
+    with pytest.raises(KeyboardInterrupt):
+        _run_main(_origin_group(40), workers=2)
+    assert len(started) <= 3
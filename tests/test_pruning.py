@@ -0,0 +1,218 @@
+# ruff: noqa: ANN001, ANN003, ANN201, D100, D101, D102, D103, D105, D107
+
+from collections.abc import Iterator
+from datetime import UTC, datetime
+
+import pytest
+import requests
+from gitlab.exceptions import GitlabDeleteError, GitlabHttpError
+
+from gitlab_migration_helper import pruning
+
+
+def test_parse_created_at():
+    # when
+    parsed = pruning._parse_created_at("2024-03-04T11:22:33.123Z")
+
+    # then
+    assert parsed == datetime(2024, 3, 4, 11, 22, 33, 123000, tzinfo=UTC)
+
+
+class FakeItem:
+    def __init__(self, item_id, created_at) -> None:
+        self.id = item_id
+        self.created_at = created_at
+
+
+class FakePages:
+    total_pages = 1
+    current_page = 1
+
+    def __init__(self, items) -> None:
+        self._items = iter(items)
+
+    def __iter__(self) -> Iterator["FakeItem"]:
+        return self._items
+
+
+class FakeManager:
+    def __init__(self, items) -> None:
+        self.items = items
+
+    def list(self, **kwargs):
+        self.list_kwargs = kwargs
+        items = self.items
+        if "sort" in kwargs:
+            items = sorted(items, key=lambda x: x.id, reverse=kwargs["sort"] == "desc")
+        return FakePages(items)
+
+
+class FakeProject:
+    def __init__(self, pipelines) -> None:
+        self.pipelines = FakeManager(pipelines)
+
+
+def _pipelines() -> list[FakeItem]:
+    return [
+        FakeItem(2, "2024-02-01T00:00:00.000Z"),
+        FakeItem(4, "2024-04-01T00:00:00.000Z"),
+        FakeItem(1, "2024-01-01T00:00:00.000Z"),
+        FakeItem(3, "2024-03-01T00:00:00.000Z"),
+    ]
+
+
+def test_extract_deletion_candidates_retains_latest():
+    # given
+    project = FakeProject(_pipelines())
+    policy = pruning.PreservationPolicy(retain_number_of_instances=2)
+
+    # when
+    candidates = pruning.extract_deletion_candidates(project, policy)
+
+    # then
+    assert [c.id for c in candidates] == [2, 1]
+    assert project.pipelines.list_kwargs["sort"] == "desc"
+
+
+def test_extract_deletion_candidates_by_age():
+    # given
+    project = FakeProject(_pipelines())
+    policy = pruning.PreservationPolicy(
+        minimum_creation_date=datetime(2024, 2, 15, tzinfo=UTC),
+    )
+
+    # when
+    candidates = pruning.extract_deletion_candidates(project, policy)
+
+    # then
+    assert [c.id for c in candidates] == [1, 2]
+    assert project.pipelines.list_kwargs["sort"] == "asc"
+
+
+class FakePipeline:
+    def __init__(self, ref, error=None) -> None:
+        self.id = ref
+        self.ref = ref
+        self.error = error
+        self.deleted = False
+
+    def delete(self):
+        if self.error is not None:
+            raise self.error
+        self.deleted = True
+
+
+def test_delete_non_protected_branch_pipelines_deletes_candidates(monkeypatch):
+    # given
+    pipelines = [FakePipeline("main"), FakePipeline("feature")]
+    deleted = []
+    monkeypatch.setattr(pruning, "validate_branch_list", lambda **_: ["main"])
+    monkeypatch.setattr(
+        pruning,
+        "_bulk_delete_pipelines",
+        lambda _, candidates: deleted.extend(candidates),
+    )
+
+    # when
+    pruning.delete_non_protected_branch_pipelines(
+        project=FakeProject(pipelines),
+        exclude_branch_refs=["main"],
+        dry_run=False,
+    )
+
+    # then
+    assert deleted == [pipelines[1]]
+
+
+class FakeGitlab:
+    url = "https://gitlab.example.com"
+
+    def __init__(self, response) -> None:
+        self.response = response
+        self.queries = []
+
+    def http_post(self, path, post_data):
+        assert path == "https://gitlab.example.com/api/graphql"
+        self.queries.append(post_data["query"])
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def test_delete_pipeline_batch_falls_back_for_failed_mutations():
+    # given
+    pipelines = [FakePipeline("a"), FakePipeline("b"), FakePipeline("c")]
+    gitlab = FakeGitlab(
+        {"data": {"p0": {"errors": []}, "p1": {"errors": ["nope"]}, "p2": None}}
+    )
+
+    # when
+    pruning._delete_pipeline_batch(gitlab, pipelines)
+
+    # then
+    assert len(gitlab.queries) == 1
+    assert gitlab.queries[0].count("pipelineDestroy") == 3
+    assert [p.deleted for p in pipelines] == [False, True, True]
+
+
+def test_preservation_policy_cutoff_is_utc():
+    # given
+    policy = pruning.PreservationPolicy(
+        maximum_age_in_days=1,
+        minimum_creation_date=datetime(2024, 2, 15),
+    )
+
+    # then
+    assert policy.minimum_allowed_created_at.tzinfo is UTC
+    assert policy.minimum_allowed_created_at is policy.minimum_allowed_created_at
+
+
+def test_validate_branch_list_drops_missing_default_branches():
+    # given
+    branches = ["main", "master", "production"]
+
+    # when
+    validated = pruning.validate_branch_list(
+        branch=branches,
+        project=None,
+        existing_branches={"master", "production", "feature"},
+    )
+
+    # then
+    assert validated == ["master", "production"]
+    assert branches == ["main", "master", "production"]
+
+
+def test_delete_pipeline_batch_tolerates_deleted_pipelines_after_failed_request():
+    # given
+    not_found = GitlabDeleteError("404 Not found", response_code=404)
+    pipelines = [FakePipeline("a", error=not_found), FakePipeline("b")]
+    gitlab = FakeGitlab(GitlabHttpError("502 Bad Gateway", response_code=502))
+
+    # when
+    pruning._delete_pipeline_batch(gitlab, pipelines)
+
+    # then
+    assert [p.deleted for p in pipelines] == [False, True]
+
+
+def test_delete_pipeline_batch_falls_back_on_connection_errors():
+    # given
+    pipelines = [FakePipeline("a"), FakePipeline("b")]
+    gitlab = FakeGitlab(requests.ConnectionError("Connection reset by peer"))
+
+    # when
+    pruning._delete_pipeline_batch(gitlab, pipelines)
+
+    # then
+    assert [p.deleted for p in pipelines] == [True, True]
+
+
+def test_delete_pipeline_reraises_other_errors():
+    # given
+    forbidden = GitlabDeleteError("403 Forbidden", response_code=403)
+    pipeline = FakePipeline("a", error=forbidden)
+
+    # then
+    with pytest.raises(GitlabDeleteError):
+        pruning._delete_pipeline(pipeline)